@@ -2,6 +2,9 @@ from __future__ import annotations
 
 import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date, datetime, timezone
 from typing import Iterable
 
@@ -10,8 +13,12 @@ from dlt.destinations.impl.postgres.configuration import PostgresCredentials
 from dpf_python import source, DataResourceType, destination
 
 import dlt
+import orjson
 import requests
 from dlt.destinations import postgres
+from requests.adapters import HTTPAdapter
+from requests_cache import CachedSession
+from urllib3.util.retry import Retry
 
 TMDB = source(name="tmdb_api", ep_type=DataResourceType.API, identifier=None)
 FILMS_WAREHOUSE_TABLE = destination(
@@ -23,6 +30,134 @@ FILMS_WAREHOUSE_TABLE = destination(
 DEFAULT_LANGUAGE = "en-US"
 DEFAULT_MAX_PAGES = 5
 
+# TMDB enforced 40 requests / 10 s per IP for years and its CDN still throttles
+# bursts, so pace requests well below that instead of eating 429 retries.
+TMDB_REQUESTS_PER_SECOND = 4.0
+TMDB_BURST = 10
+TMDB_MAX_ATTEMPTS = 3
+TMDB_FETCH_WORKERS = 8
+
+# Rows handed to dlt per yield; list yields amortize the per-row generator
+# round-trip through dlt's extractor.
+CHUNK_SIZE = 500
+
+# TMDB responses change slowly, so cache them on disk for a day; repeat runs
+# short-circuit to cached JSON without touching the network or rate limit.
+# Point TMDB_CACHE_PATH at a volume that survives between job invocations.
+TMDB_CACHE_PATH = os.getenv("TMDB_CACHE_PATH", "tmdb_cache.sqlite")
+TMDB_CACHE_TTL_SECONDS = 86400
+
+# Output columns copied verbatim from the TMDB movie payload; extracted with
+# one map() per row rather than a per-key literal in the hot loop.
+_MOVIE_FIELDS = (
+    "title",
+    "original_title",
+    "overview",
+    "popularity",
+    "vote_average",
+    "vote_count",
+    "original_language",
+    "adult",
+    "video",
+    "poster_path",
+    "backdrop_path",
+)
+
+
+class TokenBucket:
+    """Thread-safe token bucket used to pace outbound TMDB requests."""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self._rate = rate
+        self._capacity = float(burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available, then consume it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._capacity,
+                    self._tokens + (now - self._updated) * self._rate,
+                )
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self._rate
+            time.sleep(wait)
+
+
+_TOKEN_BUCKET = TokenBucket(rate=TMDB_REQUESTS_PER_SECOND, burst=TMDB_BURST)
+
+
+def _build_session() -> requests.Session:
+    # cache_control=True makes expired entries revalidate with
+    # If-None-Match/If-Modified-Since instead of refetching: a 304 from TMDB
+    # carries no body and the cached payload is reused as-is, which matters
+    # for the near-static genre list and slow-changing popular pages.
+    session = CachedSession(
+        TMDB_CACHE_PATH,
+        backend="sqlite",
+        expire_after=TMDB_CACHE_TTL_SECONDS,
+        cache_control=True,
+        allowable_codes=(200,),
+        allowable_methods=("GET",),
+    )
+    # Transport-level retries cover transient gateway errors; 429 is handled
+    # explicitly in _tmdb_get so the Retry-After header is honoured once,
+    # not multiplied across both layers. The pool is sized above the fetch
+    # worker count so concurrent page fetches reuse warm TLS connections.
+    # raise_on_status=False returns the final 5xx response instead of raising
+    # urllib3's RetryError, so raise_for_status() in _tmdb_get surfaces it as
+    # the HTTPError the page-fetch loop expects.
+    retry = Retry(
+        total=TMDB_MAX_ATTEMPTS,
+        status_forcelist=[502, 503, 504],
+        backoff_factor=0.5,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # The popular-movie payloads are verbose JSON; gzip cuts the transfer
+    # size several-fold.
+    session.headers["Accept-Encoding"] = "gzip"
+    return session
+
+
+# Shared across resource invocations so repeated runs in one process skip
+# TCP + TLS setup entirely.
+_SESSION = _build_session()
+
+
+def _tmdb_get(
+    session: requests.Session,
+    url: str,
+    params: dict,
+    headers: dict,
+) -> requests.Response:
+    """GET with rate limiting and Retry-After-aware retries on HTTP 429."""
+    for attempt in range(TMDB_MAX_ATTEMPTS):
+        _TOKEN_BUCKET.acquire()
+        response = session.get(url, params=params, headers=headers, timeout=30)
+        if response.status_code == 429 and attempt + 1 < TMDB_MAX_ATTEMPTS:
+            retry_after = response.headers.get("Retry-After")
+            try:
+                delay = float(retry_after)
+            except (TypeError, ValueError):
+                delay = 0.5 * 2**attempt
+            logging.warning("TMDB rate limited; retrying in %.1fs", delay)
+            time.sleep(delay)
+            continue
+        response.raise_for_status()
+        return response
+    raise requests.HTTPError(f"TMDB request to {url} kept returning 429")
+
 
 def _resolve_tmdb_api_key() -> str:
     auth = getattr(TMDB.config, "auth", None)
@@ -55,9 +190,8 @@ def _fetch_tmdb_popular_page(
     headers = dict(getattr(api_cfg, "default_headers", {}) or {})
     headers.update(endpoint.headers or {})
 
-    response = session.get(url, params=params, headers=headers, timeout=30)
-    response.raise_for_status()
-    return response.json()
+    response = _tmdb_get(session, url, params=params, headers=headers)
+    return orjson.loads(response.content)
 
 
 def _fetch_genres(session: requests.Session, api_key: str) -> dict[int, str]:
@@ -75,9 +209,8 @@ def _fetch_genres(session: requests.Session, api_key: str) -> dict[int, str]:
     headers = dict(getattr(api_cfg, "default_headers", {}) or {})
     headers.update(endpoint.headers or {})
 
-    response = session.get(url, params=params, headers=headers, timeout=30)
-    response.raise_for_status()
-    payload = response.json()
+    response = _tmdb_get(session, url, params=params, headers=headers)
+    payload = orjson.loads(response.content)
 
     genre_map: dict[int, str] = {}
     for item in payload.get("genres") or []:
@@ -117,22 +250,37 @@ def _fetch_genres(session: requests.Session, api_key: str) -> dict[int, str]:
 def trending_external_films_resource(
     api_key: str,
     max_pages: int,
-) -> Iterable[dict]:
+) -> Iterable[list[dict]]:
     ingested_at = datetime.now(timezone.utc)
     as_of_date = ingested_at.date()
-    session = requests.Session()
+    session = _SESSION
     yielded = 0
     genre_map = _fetch_genres(session, api_key)
+    # Hoisted locals: attribute lookups dominate the per-movie loop below.
+    _gm_get = genre_map.get
+    chunk: list[dict] = []
     try:
+        # Pages are independent, so fetch them concurrently (the token bucket
+        # in _tmdb_get keeps the burst under TMDB's limit) and emit rows in
+        # page order so rank stays deterministic.
+        payloads: dict[int, dict] = {}
+        with ThreadPoolExecutor(max_workers=TMDB_FETCH_WORKERS) as executor:
+            futures = {
+                executor.submit(_fetch_tmdb_popular_page, session, api_key, page): page
+                for page in range(1, max_pages + 1)
+            }
+            for future in as_completed(futures):
+                page = futures[future]
+                try:
+                    payloads[page] = future.result()
+                except requests.HTTPError as exc:
+                    logging.warning(
+                        "TMDB popular fetch failed for page %s: %s", page, exc
+                    )
+
         for page in range(1, max_pages + 1):
-            try:
-                payload = _fetch_tmdb_popular_page(
-                    session,
-                    api_key=api_key,
-                    page=page,
-                )
-            except requests.HTTPError as exc:
-                logging.warning("TMDB popular fetch failed for page %s: %s", page, exc)
+            payload = payloads.get(page)
+            if payload is None:
                 break
             results = payload.get("results") or []
             if not results:
@@ -141,50 +289,52 @@ def trending_external_films_resource(
             logging.info("TMDB popular page %s: %s results", page, len(results))
 
             for idx, movie in enumerate(results):
-                tmdb_movie_id = movie.get("id")
+                movie_get = movie.get
+                tmdb_movie_id = movie_get("id")
                 if tmdb_movie_id is None:
                     continue
 
-                genre_ids = movie.get("genre_ids") or []
-                genre_names = [
-                    genre_map.get(int(genre_id))
-                    for genre_id in genre_ids
-                    if isinstance(genre_id, int) and int(genre_id) in genre_map
-                ]
-                genre_names_str = ", ".join(genre_names)
+                # TMDB emits genre_ids as JSON integers, so look them up
+                # directly instead of casting and re-checking each one.
+                genre_ids = movie_get("genre_ids") or []
+                genre_names_str = ", ".join(
+                    name for name in map(_gm_get, genre_ids) if name is not None
+                )
 
-                release_date_raw = movie.get("release_date")
+                # TMDB always emits release_date as YYYY-MM-DD, so slice the
+                # fields directly instead of the fromisoformat state machine.
+                release_date_raw = movie_get("release_date")
                 release_date: date | None = None
                 if isinstance(release_date_raw, str) and release_date_raw:
                     try:
-                        release_date = datetime.fromisoformat(release_date_raw).date()
+                        release_date = date(
+                            int(release_date_raw[0:4]),
+                            int(release_date_raw[5:7]),
+                            int(release_date_raw[8:10]),
+                        )
                     except ValueError:
                         release_date = None
 
                 yielded += 1
-                yield {
+                row = {
                     "tmdb_movie_id": tmdb_movie_id,
                     "as_of_date": as_of_date,
                     "ingested_at": ingested_at,
                     "rank": (page - 1) * len(results) + (idx + 1),
                     "page": page,
-                    "title": movie.get("title"),
-                    "original_title": movie.get("original_title"),
-                    "overview": movie.get("overview"),
                     "release_date": release_date,
-                    "popularity": movie.get("popularity"),
-                    "vote_average": movie.get("vote_average"),
-                    "vote_count": movie.get("vote_count"),
-                    "original_language": movie.get("original_language"),
-                    "adult": movie.get("adult"),
-                    "video": movie.get("video"),
-                    "poster_path": movie.get("poster_path"),
-                    "backdrop_path": movie.get("backdrop_path"),
                     "genre_ids": genre_ids,
                     "genre_names": genre_names_str,
                     "payload_json": movie,
                     "source": "tmdb:/movie/popular",
                 }
+                row.update(zip(_MOVIE_FIELDS, map(movie_get, _MOVIE_FIELDS)))
+                chunk.append(row)
+                if len(chunk) >= CHUNK_SIZE:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
     finally:
         logging.info("Emitted %s TMDB rows from API", yielded)
 